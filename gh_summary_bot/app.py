@@ -11,6 +11,7 @@ from .github_source import GitHubContributionSource
 from .github_source import GraphQLClient
 from .github_source import RequestConfig
 from .storage import DatabaseInitializer
+from .storage import PostgreSQLLineStatsCache
 from .storage import PostgreSQLUserStorage
 from .templates import TelegramReportTemplate
 
@@ -41,14 +42,18 @@ class ApplicationConfig:
 class DatabasePool:
     """Database connection pool wrapper."""
 
-    def __init__(self, database_url: str) -> None:
+    def __init__(self, database_url: str, min_size: int = 5, max_size: int = 20) -> None:
         self._database_url = database_url
+        self._min_size = min_size
+        self._max_size = max_size
         self._pool: aiopg.Pool | None = None
 
     async def initialize(self) -> aiopg.Pool:
         """Initialize and return connection pool."""
         if not self._pool:
-            self._pool = await aiopg.create_pool(self._database_url)
+            # aiopg opens ``minsize`` connections up front, so the first
+            # requests don't pay the TCP/TLS/auth handshake.
+            self._pool = await aiopg.create_pool(self._database_url, minsize=self._min_size, maxsize=self._max_size)
 
             # Initialize database tables
             initializer = DatabaseInitializer(self._pool)
@@ -68,6 +73,8 @@ class Application:
         self._config = config
 
     async def run(self) -> None:
+        db_pool_wrapper: DatabasePool | None = None
+        client: GraphQLClient | None = None
         try:
             # Validate configuration
             self._config.validate()
@@ -83,7 +90,7 @@ class Application:
                 token=self._config.github_token,
             )
             client = GraphQLClient(github_config)
-            github_source = GitHubContributionSource(client)
+            github_source = GitHubContributionSource(client, line_stats_cache=PostgreSQLLineStatsCache(pool))
             template = TelegramReportTemplate()
             bot_commands = GitHubBotCommands(github_source, user_storage, template)
             bot = TelegramBotApp(self._config.telegram_token, bot_commands)
@@ -94,6 +101,8 @@ class Application:
         except Exception:
             logger.exception("Application error")
         finally:
+            if client:
+                await client.close()
             if db_pool_wrapper:
                 await db_pool_wrapper.close()
 
@@ -0,0 +1,55 @@
+"""In-process caching primitives."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+
+
+class TTLCache[K: Hashable, V]:
+    """Bounded in-memory cache with per-entry expiry and LRU eviction."""
+
+    def __init__(self, max_size: int = 1000) -> None:
+        self._max_size = max_size
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value, or None when missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V, ttl: float) -> None:
+        """Store a value for ttl seconds, evicting the least recently used entries on overflow."""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+
+class SingleFlight[K: Hashable, V]:
+    """Share one in-flight computation between concurrent callers with the same key."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[K, asyncio.Future[V]] = {}
+
+    async def run(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        """Await the running computation for key, starting it with factory if there is none."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller giving up doesn't cancel the work for the others.
+        return await asyncio.shield(future)
@@ -1,57 +1,454 @@
 import asyncio
-import json
 import logging
+import random
+import time
 from collections import defaultdict
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Mapping
 from dataclasses import dataclass
+from dataclasses import field
 from datetime import UTC
 from datetime import datetime
+from datetime import timedelta
+from functools import lru_cache
 from typing import Any
 
 import aiohttp
+import orjson
 
+from .cache import SingleFlight
+from .cache import TTLCache
 from .models import Commit
 from .models import ContributionStats
 from .models import DateRange
 from .models import LineStats
 from .models import PullRequest
+from .protocols import LineStatsCache
 from .protocols import ProgressReporter
 
 logger = logging.getLogger(__name__)
 
-
-@dataclass(frozen=True)
+_RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+_RATE_LIMIT_HEADERS = ("x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset", "x-ratelimit-used")
+
+# Past ranges only drift through profile-wide counters (followers, stars),
+# so they can live much longer than reports for ranges still in progress.
+_CLOSED_RANGE_TTL_SECONDS = 24 * 60 * 60
+_OPEN_RANGE_TTL_SECONDS = 10 * 60
+# PRs created near the end of a range still count towards it once merged,
+# so its line totals are only persisted after they have had time to land.
+_LINE_STATS_SETTLE_PERIOD = timedelta(days=30)
+
+type ContributionsKey = tuple[str, str, str]
+
+
+def _compact_query(query: str) -> str:
+    """Collapse the indentation of a GraphQL document into single spaces.
+
+    Only applied to the documents defined in this module, which carry no comments
+    and no whitespace inside string literals, so it is lossless for them.
+    """
+    return " ".join(query.split())
+
+
+_CONTRIBUTIONS_QUERY = _compact_query("""
+query($login: String!, $from: DateTime!, $to: DateTime!, $prSearch: String!) {
+  user(login: $login) {
+    id
+    contributionsCollection(from: $from, to: $to) {
+      totalCommitContributions
+      totalIssueContributions
+      totalPullRequestContributions
+      totalPullRequestReviewContributions
+      totalRepositoriesWithContributedCommits
+      totalRepositoriesWithContributedPullRequests
+      totalRepositoriesWithContributedIssues
+      restrictedContributionsCount
+      commitContributionsByRepository {
+        repository {
+          name
+          owner { login }
+          primaryLanguage { name }
+        }
+        contributions { totalCount }
+      }
+    }
+    repositories(ownerAffiliations: OWNER) {
+      totalCount
+    }
+    starredRepositories { totalCount }
+    followers { totalCount }
+    following { totalCount }
+    repositoryDiscussions {
+      totalCount
+    }
+  }
+  search(query: $prSearch, type: ISSUE, first: 100) {
+    issueCount
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes {
+      ... on PullRequest {
+        createdAt
+        mergedAt
+        additions
+        deletions
+      }
+    }
+  }
+  rateLimit { cost remaining limit resetAt }
+}
+""")
+
+_MERGED_PRS_QUERY = _compact_query("""
+query($search: String!, $cursor: String) {
+  search(query: $search, type: ISSUE, first: 100, after: $cursor) {
+    issueCount
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes {
+      ... on PullRequest {
+        createdAt
+        mergedAt
+        additions
+        deletions
+      }
+    }
+  }
+  rateLimit { cost remaining limit resetAt }
+}
+""")
+
+_USER_MERGED_PRS_QUERY = _compact_query("""
+query($login: String!, $cursor: String) {
+  user(login: $login) {
+    pullRequests(
+      first: 100,
+      states: [MERGED],
+      orderBy: {field: UPDATED_AT, direction: DESC},
+      after: $cursor
+    ) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        createdAt
+        mergedAt
+        updatedAt
+        additions
+        deletions
+      }
+    }
+  }
+  rateLimit { cost remaining limit resetAt }
+}
+""")
+
+_COMMIT_REPOSITORIES_QUERY = _compact_query("""
+query($login: String!, $from: DateTime!, $to: DateTime!) {
+  user(login: $login) {
+    id
+    contributionsCollection(from: $from, to: $to) {
+      commitContributionsByRepository {
+        repository {
+          name
+          owner { login }
+        }
+        contributions { totalCount }
+      }
+    }
+  }
+  rateLimit { cost remaining limit resetAt }
+}
+""")
+
+_PULL_REQUESTS_QUERY = _compact_query("""
+query($login: String!, $cursor: String) {
+  user(login: $login) {
+    pullRequests(
+      first: 100,
+      states: [OPEN, MERGED, CLOSED],
+      after: $cursor
+    ) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        createdAt
+        additions
+        deletions
+      }
+    }
+  }
+  rateLimit { cost remaining limit resetAt }
+}
+""")
+
+_REPO_COMMITS_QUERY = _compact_query("""
+query(
+  $owner: String!,
+  $repo: String!,
+  $user_id: ID!,
+  $since: GitTimestamp!,
+  $until: GitTimestamp!,
+  $cursor: String
+) {
+  repository(owner: $owner, name: $repo) {
+    object(expression: "HEAD") {
+      ... on Commit {
+        history(
+          first: 100,
+          since: $since,
+          until: $until,
+          author: {id: $user_id},
+          after: $cursor
+        ) {
+          pageInfo {
+            hasNextPage
+            endCursor
+          }
+          nodes {
+            oid
+            committedDate
+            additions
+            deletions
+            author {
+              user {
+                login
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+  rateLimit { cost remaining limit resetAt }
+}
+""")
+
+_REPO_LINES_QUERY = _compact_query("""
+query(
+  $owner: String!,
+  $repo: String!,
+  $user_id: ID!,
+  $since: GitTimestamp!,
+  $until: GitTimestamp!,
+  $cursor: String
+) {
+  repository(owner: $owner, name: $repo) {
+    object(expression: "HEAD") {
+      ... on Commit {
+        history(
+          first: 100,
+          since: $since,
+          until: $until,
+          author: {id: $user_id},
+          after: $cursor
+        ) {
+          pageInfo {
+            hasNextPage
+            endCursor
+          }
+          nodes {
+            additions
+            deletions
+          }
+        }
+      }
+    }
+  }
+  rateLimit { cost remaining limit resetAt }
+}
+""")
+
+
+# GitHub search never returns more results than this, whatever issueCount says.
+_SEARCH_RESULT_LIMIT = 1000
+
+# History windows paged through one aliased document.
+_HISTORY_BATCH_SIZE = 10
+# A repository with more commits than one page is split into this many time windows at most,
+# so its pages are fetched side by side instead of one cursor after another.
+_MAX_HISTORY_WINDOWS = 12
+
+type HistoryWindow = tuple[str, str, DateRange]
+
+
+def _history_windows(owner: str, repo: str, commit_count: int, date_range: DateRange) -> list[HistoryWindow]:
+    """Split a repository's range into one window per expected page of history."""
+    parts = min(max(1, -(-commit_count // 100)), _MAX_HISTORY_WINDOWS)
+    return [(owner, repo, window) for window in date_range.split(parts)]
+
+
+@lru_cache(maxsize=_HISTORY_BATCH_SIZE)
+def _repo_lines_batch_query(size: int) -> str:
+    """Build a document reading one history page of line totals for each of size windows.
+
+    Window i is aliased r{i} and bound to $owner{i}, $repo{i}, $since{i}, $until{i} and $cursor{i}.
+    """
+    params = "".join(
+        f", $owner{i}: String!, $repo{i}: String!, $since{i}: GitTimestamp!, $until{i}: GitTimestamp!"
+        f", $cursor{i}: String"
+        for i in range(size)
+    )
+    fields = "".join(
+        f"""
+  r{i}: repository(owner: $owner{i}, name: $repo{i}) {{
+    object(expression: "HEAD") {{
+      ... on Commit {{
+        history(first: 100, since: $since{i}, until: $until{i}, author: {{id: $user_id}}, after: $cursor{i}) {{
+          pageInfo {{ hasNextPage endCursor }}
+          nodes {{ additions deletions }}
+        }}
+      }}
+    }}
+  }}"""
+        for i in range(size)
+    )
+    return _compact_query(
+        f"query($user_id: ID!{params}) {{{fields}\n  rateLimit {{ cost remaining limit resetAt }}\n}}"
+    )
+
+
+@lru_cache(maxsize=32)
+def _body_prefix(query: str) -> bytes:
+    """Serialize the part of a request body that only depends on the document."""
+    return b'{"query":' + orjson.dumps(query) + b',"variables":'
+
+
+def _merged_pr_search(username: str, date_range: DateRange) -> str:
+    """Build a search query for merged PRs that may have been created or merged in the range.
+
+    Search qualifiers only take whole days, so the bounds are widened by a day
+    and the exact range is still applied to each result.
+    """
+    created_until = (date_range.end_date + timedelta(days=1)).date().isoformat()
+    merged_since = (date_range.start_date - timedelta(days=1)).date().isoformat()
+    return f"is:pr is:merged author:{username} created:<={created_until} merged:>={merged_since}"
+
+
+@dataclass(frozen=True, slots=True)
 class RateLimit:
     limit: int
     remaining: int
-    reset_at: datetime
+    reset_at_unix: float
     used: int
-    node_count: int
+    resource: str
+    # time.monotonic() value at which the budget resets, immune to wall-clock adjustments.
+    reset_deadline: float
+    # Points charged for the latest query, used as the estimate for the next one.
+    cost: int = 0
+
+    @classmethod
+    def resetting_at(
+        cls, reset_at_unix: float, *, limit: int, remaining: int, used: int, resource: str, cost: int = 0
+    ) -> "RateLimit":
+        return cls(
+            limit=limit,
+            remaining=remaining,
+            reset_at_unix=reset_at_unix,
+            used=used,
+            resource=resource,
+            reset_deadline=time.monotonic() + (reset_at_unix - time.time()),
+            cost=cost,
+        )
+
+    @property
+    def reset_at(self) -> datetime:
+        return datetime.fromtimestamp(self.reset_at_unix, tz=UTC)
 
     def seconds_until_reset(self) -> float:
-        return max(0, (self.reset_at - datetime.now(UTC)).total_seconds())
+        return max(0.0, self.reset_deadline - time.monotonic())
 
     def needs_wait(self, threshold: int = 100) -> bool:
-        return self.remaining < threshold
+        return self.remaining - self.cost < threshold
+
 
+class TokenBucket:
+    """Proactive request budget that refills at a steady rate.
 
-@dataclass(frozen=True)
+    Throttling halves the refill rate; every success adds back a tenth of the
+    nominal rate (AIMD), so concurrent callers slow down before GitHub rejects them.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        self._capacity = capacity
+        self._nominal_rate = refill_per_second
+        self._rate = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        """Take cost tokens, sleeping until the bucket has refilled enough."""
+        # Waiters queue on the lock, so they are served in arrival order.
+        async with self._lock:
+            self._refill()
+            if self._tokens < cost:
+                await asyncio.sleep((cost - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= cost
+
+    def calibrate(self, remaining: int) -> None:
+        """Never assume more budget than GitHub reports as remaining."""
+        self._refill()
+        self._tokens = min(self._tokens, float(remaining))
+
+    def throttled(self) -> None:
+        self._rate = max(self._rate / 2, self._nominal_rate / 64)
+
+    def succeeded(self) -> None:
+        self._rate = min(self._rate + self._nominal_rate / 10, self._nominal_rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+
+@dataclass(frozen=True, slots=True)
 class RequestConfig:
     base_url: str
     token: str
     timeout_seconds: int = 300
     min_remaining_threshold: int = 100
     safety_buffer: int = 10
+    max_retries: int = 4
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 30.0
+    requests_per_hour: int = 5000
+    _headers: dict[str, str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Built once; every request sends the same headers.
+        object.__setattr__(
+            self,
+            "_headers",
+            {
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+                "Accept": "application/vnd.github.v4+json",
+                "User-Agent": "GitHub-GraphQL-Python-Client/1.0",
+            },
+        )
 
     def headers(self) -> dict[str, str]:
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json",
-            "Accept": "application/vnd.github.v4+json",
-            "User-Agent": "GitHub-GraphQL-Python-Client/1.0",
-        }
+        return self._headers
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class YearRange:
     year: int
 
@@ -67,47 +464,99 @@ class GraphQLClient:
         self._config = config
         self._session: aiohttp.ClientSession | None = None
         self._rate_limit: RateLimit | None = None
+        self._bucket = TokenBucket(config.requests_per_hour, config.requests_per_hour / 3600)
 
     async def __aenter__(self) -> "GraphQLClient":
-        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self._config.timeout_seconds))
         return self
 
     async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         del exc_type, exc_val, exc_tb  # Unused parameters
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session."""
         if self._session:
             await self._session.close()
+            self._session = None
+
+    def _open_session(self) -> aiohttp.ClientSession:
+        # One session per client keeps TCP/TLS connections alive across queries.
+        if self._session is None or self._session.closed:
+            # Every request goes to one host; idle connections are kept long enough
+            # to survive the pause between two users' reports.
+            connector = aiohttp.TCPConnector(limit=32, limit_per_host=16, ttl_dns_cache=300, keepalive_timeout=75)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self._config.timeout_seconds),
+            )
+        return self._session
 
     async def query(self, query: str, variables: dict[str, Any] | None = None) -> dict[str, Any]:
-        if not self._session:
-            raise RuntimeError("Client not initialized. Use as async context manager.")
-
-        await self._check_rate_limit()
+        # Only the variables are serialized per call; the body is resent as-is on retries.
+        body = _body_prefix(query) + orjson.dumps(variables or {}) + b"}"
 
-        payload = {"query": query, "variables": variables or {}}
+        attempt = 0
+        while True:
+            await self._check_rate_limit()
+            await self._bucket.acquire()
+            try:
+                data = await self._post(body)
+            except (TransientAPIError, aiohttp.ClientError, TimeoutError) as e:
+                if attempt >= self._config.max_retries:
+                    raise GitHubAPIError(f"Request failed after {attempt + 1} attempts: {e}") from e
+                retry_after = e.retry_after if isinstance(e, TransientAPIError) else None
+                delay = self._backoff_delay(attempt, retry_after)
+                attempt += 1
+                logger.warning(f"Transient GitHub API failure: {e}. Retrying in {delay:.1f} seconds.")
+                await asyncio.sleep(delay)
+            else:
+                self._bucket.succeeded()
+                return data
 
-        async with self._session.post(self._config.base_url, json=payload, headers=self._config.headers()) as response:
-            self._rate_limit = self._extract_rate_limit(dict(response.headers))
+    async def _post(self, body: bytes) -> dict[str, Any]:
+        session = self._open_session()
+        async with session.post(self._config.base_url, data=body, headers=self._config.headers()) as response:
+            self._update_rate_limit(self._extract_rate_limit(response.headers))
+            if response.status in (403, 429):
+                self._bucket.throttled()
 
             if response.status == 401:
                 raise GitHubAPIError("Authentication failed. Check your token.")
             if response.status == 403:
                 raise GitHubAPIError("Forbidden. You may have exceeded rate limits.")
+            if response.status in _RETRYABLE_STATUSES:
+                raise TransientAPIError(f"HTTP {response.status}", response.headers.get("Retry-After"))
+            body = await response.read()
             if response.status >= 400:
-                error_text = await response.text()
-                raise GitHubAPIError(f"HTTP {response.status}: {error_text}")
+                raise GitHubAPIError(f"HTTP {response.status}: {body[:500].decode(errors='replace')}")
 
             try:
-                data = await response.json()
-            except json.JSONDecodeError as e:
+                data = orjson.loads(body)
+            except orjson.JSONDecodeError as e:
                 raise GitHubAPIError(f"Failed to parse JSON response: {e}") from e
 
+            # Every document selects rateLimit, which reports the points this query actually cost.
+            rate_limit = (data.get("data") or {}).get("rateLimit")
+            if rate_limit:
+                self._update_rate_limit(self._rate_limit_from_body(rate_limit))
+
             if "errors" in data:
                 errors = data["errors"]
                 error_messages = [error.get("message", "Unknown error") for error in errors]
-                raise GitHubAPIError(f"GraphQL errors: {'; '.join(error_messages)}")
+                raise GraphQLError(f"GraphQL errors: {'; '.join(error_messages)}", errors, data.get("data"))
 
             return data.get("data", {})
 
+    def _backoff_delay(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        base = self._config.retry_base_delay
+        jitter = random.random() * base  # noqa: S311 - jitter, not cryptography
+        return min(base * 2**attempt, self._config.retry_max_delay) + jitter
+
     async def _check_rate_limit(self) -> None:
         if not self._rate_limit:
             return
@@ -124,221 +573,260 @@ class GraphQLClient:
                 )
                 await asyncio.sleep(wait_time)
 
-    def _extract_rate_limit(self, headers: dict[str, str]) -> RateLimit | None:
+    def _update_rate_limit(self, rate_limit: RateLimit | None) -> None:
+        if rate_limit:
+            self._rate_limit = rate_limit
+            self._bucket.calibrate(rate_limit.remaining)
+
+    def _extract_rate_limit(self, headers: Mapping[str, str]) -> RateLimit | None:
         try:
-            limit = int(headers.get("x-ratelimit-limit", 0))
-            remaining = int(headers.get("x-ratelimit-remaining", 0))
-
-            if limit == 0 and remaining == 0:
-                return None
-
-            return RateLimit(
-                limit=limit,
-                remaining=remaining,
-                reset_at=datetime.fromtimestamp(int(headers.get("x-ratelimit-reset", 0)), tz=UTC),
-                used=int(headers.get("x-ratelimit-used", 0)),
-                node_count=int(headers.get("x-ratelimit-resource", 0)),
-            )
-        except (KeyError, ValueError) as e:
+            limit, remaining, reset_at_unix, used = (int(headers[name]) for name in _RATE_LIMIT_HEADERS)
+        except KeyError:
+            # Responses without a budget, e.g. gateway errors, carry no rate limit headers.
+            return None
+        except ValueError as e:
             logger.warning(f"Failed to parse rate limit headers: {e}")
             return None
 
+        return RateLimit.resetting_at(
+            reset_at_unix,
+            limit=limit,
+            remaining=remaining,
+            used=used,
+            # Names the budget the numbers belong to ("graphql" here); it is not a count.
+            resource=headers.get("x-ratelimit-resource", "graphql"),
+        )
+
+    def _rate_limit_from_body(self, rate_limit: dict[str, Any]) -> RateLimit | None:
+        try:
+            return RateLimit.resetting_at(
+                datetime.fromisoformat(rate_limit["resetAt"]).timestamp(),
+                limit=rate_limit["limit"],
+                remaining=rate_limit["remaining"],
+                used=rate_limit["limit"] - rate_limit["remaining"],
+                resource="graphql",
+                cost=rate_limit["cost"],
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to parse rateLimit field: {e}")
+            return None
+
 
 class GitHubContributionSource:
-    def __init__(self, client: GraphQLClient, progress: ProgressReporter | None = None) -> None:
+    def __init__(
+        self,
+        client: GraphQLClient,
+        progress: ProgressReporter | None = None,
+        max_concurrency: int = 8,
+        cache: TTLCache[ContributionsKey, ContributionStats] | None = None,
+        inflight: SingleFlight[ContributionsKey, ContributionStats] | None = None,
+        line_stats_cache: LineStatsCache | None = None,
+        limiter: asyncio.Semaphore | None = None,
+    ) -> None:
         self._client = client
         self._progress = progress
+        self._max_concurrency = max_concurrency
+        # One bound for every fan-out of this source and its progress-reporting copies.
+        self._limiter = limiter if limiter is not None else asyncio.Semaphore(max_concurrency)
+        self._cache = cache if cache is not None else TTLCache()
+        self._inflight = inflight if inflight is not None else SingleFlight()
+        self._line_stats_cache = line_stats_cache
 
     async def _report_progress(self, message: str) -> None:
         if self._progress:
             await self._progress.report(message)
 
     def with_progress_reporter(self, progress: ProgressReporter) -> "GitHubContributionSource":
-        return GitHubContributionSource(self._client, progress)
+        return GitHubContributionSource(
+            self._client,
+            progress,
+            max_concurrency=self._max_concurrency,
+            cache=self._cache,
+            inflight=self._inflight,
+            line_stats_cache=self._line_stats_cache,
+            limiter=self._limiter,
+        )
 
     async def contributions(self, username: str, date_range: DateRange) -> ContributionStats:
+        # Logins are case-insensitive and GitHub only sees whole seconds of the bounds.
+        key = (username.lower(), *date_range.to_github_format())
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        # Identical reports requested concurrently share one set of GitHub queries.
+        return await self._inflight.run(key, lambda: self._fetch_and_cache(key, username, date_range))
+
+    async def contributions_many(self, username: str, date_ranges: list[DateRange]) -> list[ContributionStats]:
+        """Fetch statistics for several date ranges concurrently, in the order given."""
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(self.contributions(username, date_range)) for date_range in date_ranges]
+        return [task.result() for task in tasks]
+
+    async def _fetch_and_cache(self, key: ContributionsKey, username: str, date_range: DateRange) -> ContributionStats:
+        stats = await self._fetch_contributions(username, date_range)
+        # Don't pin a report whose line stats failed or are partial; the next request retries them.
+        if stats.lines_complete and stats.lines_calculation_method not in ("error", "none"):
+            ttl = _CLOSED_RANGE_TTL_SECONDS if date_range.has_ended() else _OPEN_RANGE_TTL_SECONDS
+            self._cache.put(key, stats, ttl)
+        return stats
+
+    async def _fetch_contributions(self, username: str, date_range: DateRange) -> ContributionStats:
         await self._report_progress("Fetching contribution statistics...")
 
-        async with self._client as client:
-            start_date, end_date = date_range.to_github_format()
-
-            query = """
-            query($login: String!, $from: DateTime!, $to: DateTime!) {
-              user(login: $login) {
-                contributionsCollection(from: $from, to: $to) {
-                  totalCommitContributions
-                  totalIssueContributions
-                  totalPullRequestContributions
-                  totalPullRequestReviewContributions
-                  totalRepositoriesWithContributedCommits
-                  totalRepositoriesWithContributedPullRequests
-                  totalRepositoriesWithContributedIssues
-                  restrictedContributionsCount
-                  commitContributionsByRepository {
-                    repository {
-                      name
-                      primaryLanguage { name }
-                    }
-                    contributions { totalCount }
-                  }
-                }
-                repositories(ownerAffiliations: OWNER) {
-                  totalCount
-                }
-                starredRepositories { totalCount }
-                followers { totalCount }
-                following { totalCount }
-                issues(states: [OPEN, CLOSED]) {
-                  totalCount
-                }
-                repositoryDiscussions {
-                  totalCount
-                }
-              }
-            }
-            """
+        client = self._client
+        start_date, end_date = date_range.to_github_format()
 
-            variables = {
-                "login": username,
-                "from": start_date,
-                "to": end_date,
-            }
+        variables = {
+            "login": username,
+            "from": start_date,
+            "to": end_date,
+            "prSearch": _merged_pr_search(username, date_range),
+        }
+
+        try:
+            data = await self._query_contributions(client, variables)
+            user_data = data["user"]
+            contributions = user_data["contributionsCollection"]
+
+            await self._report_progress("Processing contribution data...")
+
+            languages: dict[str, int] = defaultdict(int)
+            for repo_contrib in contributions["commitContributionsByRepository"]:
+                primary_language = repo_contrib["repository"]["primaryLanguage"]
+                if primary_language:
+                    languages[primary_language["name"]] += repo_contrib["contributions"]["totalCount"]
+
+            repos_contributed = (
+                contributions["totalRepositoriesWithContributedCommits"]
+                + contributions["totalRepositoriesWithContributedPullRequests"]
+                + contributions["totalRepositoriesWithContributedIssues"]
+            )
+
+            await self._report_progress("Calculating line statistics...")
 
             try:
-                data = await client.query(query, variables)
-                user_data = data["user"]
-                contributions = user_data["contributionsCollection"]
-
-                await self._report_progress("Processing contribution data...")
-
-                languages: dict[str, int] = defaultdict(int)
-                for repo_contrib in contributions["commitContributionsByRepository"]:
-                    if repo_contrib["repository"]["primaryLanguage"]:
-                        lang = repo_contrib["repository"]["primaryLanguage"]["name"]
-                        count = repo_contrib["contributions"]["totalCount"]
-                        languages[lang] += count
-
-                repos_contributed = (
-                    contributions["totalRepositoriesWithContributedCommits"]
-                    + contributions["totalRepositoriesWithContributedPullRequests"]
-                    + contributions["totalRepositoriesWithContributedIssues"]
+                line_stats = await self._line_stats(
+                    client,
+                    username,
+                    date_range,
+                    data.get("search"),
+                    user_data["id"],
+                    contributions["commitContributionsByRepository"],
                 )
+                lines_added = line_stats.lines_added
+                lines_deleted = line_stats.lines_deleted
+                calculation_method = line_stats.calculation_method
+                lines_complete = line_stats.complete
+            except Exception as e:
+                logger.warning(f"Failed to calculate line stats: {e}")
+                lines_added = 0
+                lines_deleted = 0
+                calculation_method = "none"
+                lines_complete = False
+
+            return ContributionStats(
+                username=username,
+                date_range=date_range,
+                total_commits=contributions["totalCommitContributions"],
+                total_prs=contributions["totalPullRequestContributions"],
+                total_issues=contributions["totalIssueContributions"],
+                total_discussions=user_data["repositoryDiscussions"]["totalCount"],
+                total_reviews=contributions["totalPullRequestReviewContributions"],
+                repositories_contributed=repos_contributed,
+                languages=languages,
+                starred_repos=user_data["starredRepositories"]["totalCount"],
+                followers=user_data["followers"]["totalCount"],
+                following=user_data["following"]["totalCount"],
+                public_repos=user_data["repositories"]["totalCount"],
+                private_contributions=contributions["restrictedContributionsCount"],
+                lines_added=lines_added,
+                lines_deleted=lines_deleted,
+                lines_calculation_method=calculation_method,
+                lines_complete=lines_complete,
+            )
 
-                await self._report_progress("Calculating line statistics...")
-
-                try:
-                    line_stats = await self._calculate_lines_from_prs(client, username, date_range)
-                    if line_stats.pr_count == 0:
-                        await self._report_progress("No PRs found, falling back to commit-based calculation...")
-                        line_stats = await self._calculate_lines_from_commits(client, username, date_range)
-                    lines_added = line_stats.lines_added
-                    lines_deleted = line_stats.lines_deleted
-                    calculation_method = line_stats.calculation_method
-                except Exception as e:
-                    logger.warning(f"Failed to calculate line stats: {e}")
-                    lines_added = 0
-                    lines_deleted = 0
-                    calculation_method = "none"
-
-                return ContributionStats(
-                    username=username,
-                    date_range=date_range,
-                    total_commits=contributions["totalCommitContributions"],
-                    total_prs=contributions["totalPullRequestContributions"],
-                    total_issues=contributions["totalIssueContributions"],
-                    total_discussions=user_data["repositoryDiscussions"]["totalCount"],
-                    total_reviews=contributions["totalPullRequestReviewContributions"],
-                    repositories_contributed=repos_contributed,
-                    languages=languages,
-                    starred_repos=user_data["starredRepositories"]["totalCount"],
-                    followers=user_data["followers"]["totalCount"],
-                    following=user_data["following"]["totalCount"],
-                    public_repos=user_data["repositories"]["totalCount"],
-                    private_contributions=contributions["restrictedContributionsCount"],
-                    lines_added=lines_added,
-                    lines_deleted=lines_deleted,
-                    lines_calculation_method=calculation_method,
-                )
+        except Exception as e:
+            logger.exception(f"Error fetching contributions for {username} ({date_range.description()})")
+            raise GitHubAPIError(f"Failed to fetch contributions: {e}") from e
 
+    async def _query_contributions(self, client: GraphQLClient, variables: dict[str, Any]) -> dict[str, Any]:
+        try:
+            return await client.query(_CONTRIBUTIONS_QUERY, variables)
+        except GraphQLError as e:
+            # The embedded PR search can fail on its own (e.g. a search timeout); the rest of the
+            # report is still usable and the search is retried as a separate query.
+            if e.data is None or not e.only_affects("search"):
+                raise
+            logger.warning(f"Embedded merged PR search failed, fetching it separately: {e}")
+            return {**e.data, "search": None}
+
+    async def _line_stats(
+        self,
+        client: GraphQLClient,
+        username: str,
+        date_range: DateRange,
+        first_pr_page: dict[str, Any] | None,
+        user_id: str,
+        repo_contribs: list[dict[str, Any]],
+    ) -> LineStats:
+        # Totals for a range that has long ended are persisted and fetched only once,
+        # keyed like the report cache on the case-insensitive login.
+        cache = self._line_stats_cache if date_range.has_ended(since=_LINE_STATS_SETTLE_PERIOD) else None
+        if cache is not None:
+            try:
+                cached = await cache.line_stats(username.lower(), date_range)
+            except Exception as e:
+                logger.warning(f"Failed to read cached line stats: {e}")
+                cached = None
+            if cached is not None:
+                return cached
+
+        line_stats = await self._calculate_lines_from_prs(client, username, date_range, first_page=first_pr_page)
+        if line_stats.calculation_method == "error":
+            # A failed search says nothing about whether there are PRs, so commits would be a guess.
+            return line_stats
+        if line_stats.pr_count == 0:
+            await self._report_progress("No PRs found, falling back to commit-based calculation...")
+            line_stats = await self._calculate_lines_from_commits(client, user_id, repo_contribs, date_range)
+
+        if cache is not None and line_stats.complete and line_stats.calculation_method != "error":
+            try:
+                await cache.store_line_stats(username.lower(), date_range, line_stats)
             except Exception as e:
-                logger.exception(f"Error fetching contributions for {username} ({date_range.description()})")
-                raise GitHubAPIError(f"Failed to fetch contributions: {e}") from e
+                logger.warning(f"Failed to persist line stats: {e}")
+        return line_stats
 
-    async def _calculate_lines_from_prs(self, client: GraphQLClient, username: str, date_range: DateRange) -> LineStats:
+    async def _calculate_lines_from_prs(
+        self,
+        client: GraphQLClient,
+        username: str,
+        date_range: DateRange,
+        first_page: dict[str, Any] | None = None,
+    ) -> LineStats:
         await self._report_progress("Fetching pull request data...")
         start_date, end_date = date_range.to_github_format()
 
-        pr_query = """
-        query($login: String!, $cursor: String) {
-          user(login: $login) {
-            pullRequests(
-              first: 100,
-              states: [MERGED],
-              after: $cursor,
-              orderBy: {field: CREATED_AT, direction: DESC}
-            ) {
-              pageInfo {
-                hasNextPage
-                endCursor
-              }
-              nodes {
-                createdAt
-                mergedAt
-                additions
-                deletions
-                baseRepository {
-                  owner {
-                    login
-                  }
-                }
-              }
-            }
-          }
-        }
-        """
-
         total_added = 0
         total_deleted = 0
         pr_count = 0
-        cursor = None
 
         try:
-            while True:
-                data = await client.query(
-                    pr_query,
-                    {
-                        "login": username,
-                        "cursor": cursor,
-                    },
-                )
-
+            async for pr_nodes in self._merged_pull_request_pages(client, username, date_range, first_page):
                 if pr_count > 0 and pr_count % 100 == 0:
                     await self._report_progress(f"Processed {pr_count} pull requests...")
 
-                pr_result = data["user"]["pullRequests"]
-                range_prs = []
-
-                for pr_node in pr_result["nodes"]:
-                    created_at = datetime.fromisoformat(pr_node["createdAt"])
-                    merged_at = pr_node.get("mergedAt")
-                    merged_at_dt = None
-                    if merged_at:
-                        merged_at_dt = datetime.fromisoformat(merged_at)
-
-                    # Include PR if created or merged within the date range
-                    if (date_range.start_date <= created_at <= date_range.end_date) or (
-                        merged_at_dt and date_range.start_date <= merged_at_dt <= date_range.end_date
-                    ):
-                        range_prs.append(pr_node)
-
-                for pr_node in range_prs:
-                    total_added += pr_node["additions"] or 0
-                    total_deleted += pr_node["deletions"] or 0
-                    pr_count += 1
+                # GitHub timestamps share the bounds' fixed-width UTC format,
+                # so plain string comparison orders them without parsing.
+                range_prs = [
+                    pr_node
+                    for pr_node in pr_nodes
+                    if start_date <= pr_node["createdAt"] <= end_date
+                    or start_date <= (pr_node.get("mergedAt") or "") <= end_date
+                ]
 
-                if not pr_result["pageInfo"]["hasNextPage"]:
-                    break
-                cursor = pr_result["pageInfo"]["endCursor"]
+                total_added += sum(pr_node["additions"] or 0 for pr_node in range_prs)
+                total_deleted += sum(pr_node["deletions"] or 0 for pr_node in range_prs)
+                pr_count += len(range_prs)
 
             return LineStats(
                 lines_added=total_added,
@@ -357,61 +845,32 @@ class GitHubContributionSource:
             )
 
     async def _calculate_lines_from_commits(
-        self, client: GraphQLClient, username: str, date_range: DateRange
+        self,
+        client: GraphQLClient,
+        user_id: str,
+        repo_contribs: list[dict[str, Any]],
+        date_range: DateRange,
     ) -> LineStats:
         await self._report_progress("Calculating lines from commits...")
 
         try:
-            start_date, end_date = date_range.to_github_format()
-
-            repos_query = """
-            query($login: String!, $from: DateTime!, $to: DateTime!) {
-              user(login: $login) {
-                id
-                contributionsCollection(from: $from, to: $to) {
-                  commitContributionsByRepository {
-                    repository {
-                      name
-                      owner { login }
-                    }
-                  }
-                }
-              }
-            }
-            """
-
-            data = await client.query(
-                repos_query,
-                {
-                    "login": username,
-                    "from": start_date,
-                    "to": end_date,
-                },
+            windows = [
+                window
+                for owner, repo, commit_count in await self._contributed_repos(repo_contribs)
+                for window in _history_windows(owner, repo, commit_count, date_range)
+            ]
+            repo_stats = await self._in_batches(
+                windows,
+                lambda batch: self._batch_line_stats(client, batch, user_id),
+                batch_size=_HISTORY_BATCH_SIZE,
             )
 
-            repo_contribs = data["user"]["contributionsCollection"]["commitContributionsByRepository"]
-            user_id = data["user"]["id"]
-
-            total_added = 0
-            total_deleted = 0
-            commit_count = 0
-
-            for repo_contrib in repo_contribs:
-                repo_name = repo_contrib["repository"]["name"]
-                owner_login = repo_contrib["repository"]["owner"]["login"]
-
-                repo_commits = await self._fetch_repo_commits(client, owner_login, repo_name, user_id, date_range)
-
-                for commit in repo_commits:
-                    total_added += commit.additions
-                    total_deleted += commit.deletions
-                    commit_count += 1
-
             return LineStats(
-                lines_added=total_added,
-                lines_deleted=total_deleted,
+                lines_added=sum(stats.lines_added for stats in repo_stats),
+                lines_deleted=sum(stats.lines_deleted for stats in repo_stats),
                 calculation_method="commits",
-                commit_count=commit_count,
+                commit_count=sum(stats.commit_count for stats in repo_stats),
+                complete=all(stats.complete for stats in repo_stats),
             )
 
         except Exception as e:
@@ -424,99 +883,155 @@ class GitHubContributionSource:
             )
 
     async def commits(self, username: str, date_range: DateRange) -> list[Commit]:
-        async with self._client as client:
-            start_date, end_date = date_range.to_github_format()
-
-            repos_query = """
-            query($login: String!, $from: DateTime!, $to: DateTime!) {
-              user(login: $login) {
-                id
-                contributionsCollection(from: $from, to: $to) {
-                  commitContributionsByRepository {
-                    repository {
-                      name
-                      owner { login }
-                    }
-                  }
-                }
-              }
-            }
-            """
-
-            try:
-                data = await client.query(
-                    repos_query,
-                    {
-                        "login": username,
-                        "from": start_date,
-                        "to": end_date,
-                    },
-                )
+        client = self._client
+        start_date, end_date = date_range.to_github_format()
 
-                repo_contribs = data["user"]["contributionsCollection"]["commitContributionsByRepository"]
-                user_id = data["user"]["id"]
-                all_commits = []
-                for repo_contrib in repo_contribs:
-                    repo_name = repo_contrib["repository"]["name"]
-                    owner_login = repo_contrib["repository"]["owner"]["login"]
+        try:
+            data = await client.query(
+                _COMMIT_REPOSITORIES_QUERY,
+                {
+                    "login": username,
+                    "from": start_date,
+                    "to": end_date,
+                },
+            )
 
-                    repo_commits = await self._fetch_repo_commits(client, owner_login, repo_name, user_id, date_range)
-                    all_commits.extend(repo_commits)
-            except Exception as e:
-                logger.exception(f"Error fetching commits for {username} ({date_range.description()})")
-                raise GitHubAPIError(f"Failed to fetch commits: {e}") from e
-            else:
-                return all_commits
+            repo_contribs = data["user"]["contributionsCollection"]["commitContributionsByRepository"]
+            user_id = data["user"]["id"]
+            all_commits = [
+                commit
+                for repo_commits in await self._per_repo(
+                    repo_contribs,
+                    lambda owner, repo: self._fetch_repo_commits(client, owner, repo, user_id, date_range),
+                )
+                for commit in repo_commits
+            ]
+        except Exception as e:
+            logger.exception(f"Error fetching commits for {username} ({date_range.description()})")
+            raise GitHubAPIError(f"Failed to fetch commits: {e}") from e
+        else:
+            return all_commits
 
     async def pull_requests(self, username: str) -> list[PullRequest]:
-        async with self._client as client:
-            pr_query = """
-            query($login: String!, $cursor: String) {
-              user(login: $login) {
-                pullRequests(
-                  first: 100,
-                  states: [OPEN, MERGED, CLOSED],
-                  after: $cursor
-                ) {
-                  pageInfo {
-                    hasNextPage
-                    endCursor
-                  }
-                  nodes {
-                    createdAt
-                    additions
-                    deletions
-                  }
-                }
-              }
-            }
-            """
+        client = self._client
 
-            all_prs: list[PullRequest] = []
-            cursor = None
+        all_prs: list[PullRequest] = []
 
-            try:
-                while True:
-                    data = await client.query(pr_query, {"login": username, "cursor": cursor})
-                    pr_result = data["user"]["pullRequests"]
-
-                    all_prs.extend(
-                        PullRequest(
-                            created_at=pr_node["createdAt"],
-                            additions=pr_node["additions"] or 0,
-                            deletions=pr_node["deletions"] or 0,
-                        )
-                        for pr_node in pr_result["nodes"]
+        try:
+            async for pr_nodes in self._pull_request_pages(
+                client, _PULL_REQUESTS_QUERY, {"login": username}, lambda data: data["user"]["pullRequests"]
+            ):
+                all_prs.extend(
+                    PullRequest(
+                        created_at=pr_node["createdAt"],
+                        additions=pr_node["additions"] or 0,
+                        deletions=pr_node["deletions"] or 0,
                     )
+                    for pr_node in pr_nodes
+                )
+        except Exception as e:
+            logger.exception(f"Error fetching PRs for {username}")
+            raise GitHubAPIError(f"Failed to fetch pull requests: {e}") from e
+        else:
+            return all_prs
 
-                    if not pr_result["pageInfo"]["hasNextPage"]:
-                        break
-                    cursor = pr_result["pageInfo"]["endCursor"]
-            except Exception as e:
-                logger.exception(f"Error fetching PRs for {username}")
-                raise GitHubAPIError(f"Failed to fetch pull requests: {e}") from e
-            else:
-                return all_prs
+    async def _merged_pull_request_pages(
+        self,
+        client: GraphQLClient,
+        username: str,
+        date_range: DateRange,
+        first_page: dict[str, Any] | None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        variables = {"search": _merged_pr_search(username, date_range)}
+        if first_page is None:
+            first_page = (await client.query(_MERGED_PRS_QUERY, {**variables, "cursor": None}))["search"]
+
+        if first_page["issueCount"] <= _SEARCH_RESULT_LIMIT:
+            async for pr_nodes in self._pull_request_pages(
+                client, _MERGED_PRS_QUERY, variables, lambda data: data["search"], first_page
+            ):
+                yield pr_nodes
+            return
+
+        logger.warning(
+            f"{first_page['issueCount']} merged PRs match {variables['search']!r}, more than search returns; "
+            f"walking all merged PRs of {username} instead"
+        )
+        start_date, _ = date_range.to_github_format()
+        async for pr_nodes in self._pull_request_pages(
+            client, _USER_MERGED_PRS_QUERY, {"login": username}, lambda data: data["user"]["pullRequests"]
+        ):
+            yield pr_nodes
+            # Merging updates a PR, so once updatedAt falls before the range every later PR was merged before it.
+            if pr_nodes and pr_nodes[-1]["updatedAt"] < start_date:
+                return
+
+    async def _pull_request_pages(
+        self,
+        client: GraphQLClient,
+        pr_query: str,
+        variables: dict[str, Any],
+        connection: Callable[[dict[str, Any]], dict[str, Any]],
+        first_page: dict[str, Any] | None = None,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        # The first page may already have arrived with another query.
+        pr_result = first_page
+        cursor = None
+
+        while True:
+            if pr_result is None:
+                pr_result = connection(await client.query(pr_query, {**variables, "cursor": cursor}))
+
+            yield pr_result["nodes"]
+
+            if not pr_result["pageInfo"]["hasNextPage"]:
+                return
+            cursor = pr_result["pageInfo"]["endCursor"]
+            pr_result = None
+
+    async def _per_repo[T](
+        self,
+        repo_contribs: list[dict[str, Any]],
+        fetch: Callable[[str, str], Awaitable[T]],
+    ) -> list[T]:
+        async def fetch_repo(repo: tuple[str, str, int]) -> T:
+            owner, name, _ = repo
+            return await fetch(owner, name)
+
+        return await self._bounded_map(await self._contributed_repos(repo_contribs), fetch_repo)
+
+    async def _contributed_repos(self, repo_contribs: list[dict[str, Any]]) -> list[tuple[str, str, int]]:
+        # Repositories without commits in the range would cost a request for an empty history.
+        repos = [
+            (rc["repository"]["owner"]["login"], rc["repository"]["name"], rc["contributions"]["totalCount"])
+            for rc in repo_contribs
+            if rc["contributions"]["totalCount"] > 0
+        ]
+        await self._report_progress(f"Fetching commits from {len(repos)} repositories...")
+        return repos
+
+    async def _in_batches[A, T](
+        self,
+        items: list[A],
+        fetch: Callable[[list[A]], Awaitable[T]],
+        batch_size: int,
+    ) -> list[T]:
+        return await self._bounded_map([items[i : i + batch_size] for i in range(0, len(items), batch_size)], fetch)
+
+    async def _bounded_map[A, T](self, items: list[A], fetch: Callable[[A], Awaitable[T]]) -> list[T]:
+        """Apply fetch to every item concurrently, at most max_concurrency at a time, keeping order."""
+
+        async def bounded(item: A) -> T:
+            async with self._limiter:
+                return await fetch(item)
+
+        # A failing item cancels the rest instead of leaving them paging for a discarded result.
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(bounded(item)) for item in items]
+        except ExceptionGroup as e:
+            raise e.exceptions[0] from None
+        return [task.result() for task in tasks]
 
     async def _fetch_repo_commits(
         self,
@@ -526,71 +1041,12 @@ class GitHubContributionSource:
         user_id: str,
         date_range: DateRange,
     ) -> list[Commit]:
-        repo_commits_query = """
-        query(
-          $owner: String!,
-          $repo: String!,
-          $user_id: ID!,
-          $since: GitTimestamp!,
-          $until: GitTimestamp!,
-          $cursor: String
-        ) {
-          repository(owner: $owner, name: $repo) {
-            object(expression: "HEAD") {
-              ... on Commit {
-                history(
-                  first: 100,
-                  since: $since,
-                  until: $until,
-                  author: {id: $user_id},
-                  after: $cursor
-                ) {
-                  pageInfo {
-                    hasNextPage
-                    endCursor
-                  }
-                  nodes {
-                    oid
-                    committedDate
-                    additions
-                    deletions
-                    author {
-                      user {
-                        login
-                      }
-                    }
-                  }
-                }
-              }
-            }
-          }
-        }
-        """
-
         commits: list[Commit] = []
-        cursor = None
 
         try:
-            while True:
-                start_date, end_date = date_range.to_github_format()
-                data = await client.query(
-                    repo_commits_query,
-                    {
-                        "owner": owner,
-                        "repo": repo,
-                        "user_id": user_id,
-                        "since": start_date,
-                        "until": end_date,
-                        "cursor": cursor,
-                    },
-                )
-
-                if not data["repository"] or not data["repository"]["object"]:
-                    break
-
-                history = data["repository"]["object"]["history"]
-                repo_commits = history["nodes"]
-
+            async for repo_commits in self._repo_commit_pages(
+                client, _REPO_COMMITS_QUERY, owner, repo, user_id, date_range
+            ):
                 commits.extend(
                     Commit(
                         oid=commit["oid"],
@@ -601,16 +1057,170 @@ class GitHubContributionSource:
                     )
                     for commit in repo_commits
                 )
+        except Exception as e:
+            logger.warning(f"Error fetching commits from {owner}/{repo}: {e}")
+
+        return commits
 
-                if not history["pageInfo"]["hasNextPage"]:
-                    break
-                cursor = history["pageInfo"]["endCursor"]
+    async def _repo_line_stats(
+        self,
+        client: GraphQLClient,
+        owner: str,
+        repo: str,
+        user_id: str,
+        date_range: DateRange,
+    ) -> LineStats:
+        # Reduce each page as it arrives instead of keeping every commit alive.
+        total_added = 0
+        total_deleted = 0
+        commit_count = 0
+        complete = True
 
+        try:
+            async for repo_commits in self._repo_commit_pages(
+                client, _REPO_LINES_QUERY, owner, repo, user_id, date_range
+            ):
+                total_added += sum(commit["additions"] or 0 for commit in repo_commits)
+                total_deleted += sum(commit["deletions"] or 0 for commit in repo_commits)
+                commit_count += len(repo_commits)
         except Exception as e:
             logger.warning(f"Error fetching commits from {owner}/{repo}: {e}")
+            complete = False
 
-        return commits
+        return LineStats(
+            lines_added=total_added,
+            lines_deleted=total_deleted,
+            calculation_method="commits",
+            commit_count=commit_count,
+            complete=complete,
+        )
+
+    async def _batch_line_stats(
+        self,
+        client: GraphQLClient,
+        windows: list[HistoryWindow],
+        user_id: str,
+    ) -> LineStats:
+        # Each window keeps its own cursor; finished ones drop out of the next page's document.
+        cursors: dict[int, str | None] = dict.fromkeys(range(len(windows)))
+        total_added = 0
+        total_deleted = 0
+        commit_count = 0
+
+        try:
+            while cursors:
+                pending = list(cursors.items())
+                variables: dict[str, Any] = {"user_id": user_id}
+                for i, (index, cursor) in enumerate(pending):
+                    owner, repo, window = windows[index]
+                    variables[f"owner{i}"] = owner
+                    variables[f"repo{i}"] = repo
+                    variables[f"since{i}"], variables[f"until{i}"] = window.to_github_format()
+                    variables[f"cursor{i}"] = cursor
+
+                data = await client.query(_repo_lines_batch_query(len(pending)), variables)
+
+                for i, (index, _) in enumerate(pending):
+                    repository = data[f"r{i}"]
+                    if not repository or not repository["object"]:
+                        del cursors[index]
+                        continue
+                    history = repository["object"]["history"]
+                    nodes = history["nodes"]
+                    total_added += sum(commit["additions"] or 0 for commit in nodes)
+                    total_deleted += sum(commit["deletions"] or 0 for commit in nodes)
+                    commit_count += len(nodes)
+                    if history["pageInfo"]["hasNextPage"]:
+                        cursors[index] = history["pageInfo"]["endCursor"]
+                    else:
+                        del cursors[index]
+        except GraphQLError as e:
+            # One inaccessible repository fails the whole document; retry one by one
+            # so it only costs its own totals. Transport and rate limit failures are
+            # not retried here, as more requests would only make them worse.
+            # The retries run in the concurrency slot this batch already holds.
+            logger.warning(f"Batched commit history query failed, retrying {len(windows)} windows one by one: {e}")
+            window_stats = [
+                await self._repo_line_stats(client, owner, repo, user_id, window) for owner, repo, window in windows
+            ]
+            return LineStats(
+                lines_added=sum(stats.lines_added for stats in window_stats),
+                lines_deleted=sum(stats.lines_deleted for stats in window_stats),
+                calculation_method="commits",
+                commit_count=sum(stats.commit_count for stats in window_stats),
+                complete=all(stats.complete for stats in window_stats),
+            )
+
+        return LineStats(
+            lines_added=total_added,
+            lines_deleted=total_deleted,
+            calculation_method="commits",
+            commit_count=commit_count,
+        )
+
+    async def _repo_commit_pages(
+        self,
+        client: GraphQLClient,
+        repo_commits_query: str,
+        owner: str,
+        repo: str,
+        user_id: str,
+        date_range: DateRange,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        start_date, end_date = date_range.to_github_format()
+        cursor = None
+
+        while True:
+            data = await client.query(
+                repo_commits_query,
+                {
+                    "owner": owner,
+                    "repo": repo,
+                    "user_id": user_id,
+                    "since": start_date,
+                    "until": end_date,
+                    "cursor": cursor,
+                },
+            )
+
+            if not data["repository"] or not data["repository"]["object"]:
+                return
+
+            history = data["repository"]["object"]["history"]
+            yield history["nodes"]
+
+            if not history["pageInfo"]["hasNextPage"]:
+                return
+            cursor = history["pageInfo"]["endCursor"]
 
 
 class GitHubAPIError(Exception):
     pass
+
+
+class GraphQLError(GitHubAPIError):
+    """GitHub answered, but reported errors for the document (e.g. an inaccessible repository)."""
+
+    def __init__(
+        self, message: str, errors: list[dict[str, Any]] | None = None, data: dict[str, Any] | None = None
+    ) -> None:
+        super().__init__(message)
+        self.errors = errors or []
+        # Fields GitHub could still resolve; the ones named in errors are null.
+        self.data = data
+
+    def only_affects(self, field: str) -> bool:
+        """Check whether every error is confined to one top-level field of a partial response."""
+        return (
+            self.data is not None
+            and bool(self.errors)
+            and all((error.get("path") or [None])[0] == field for error in self.errors)
+        )
+
+
+class TransientAPIError(GitHubAPIError):
+    """Retryable failure (throttling or a gateway error)."""
+
+    def __init__(self, message: str, retry_after: str | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -7,7 +7,7 @@ from datetime import datetime
 from datetime import timedelta
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DateRange:
     """Represents a date range for analysis."""
 
@@ -16,8 +16,11 @@ class DateRange:
 
     @classmethod
     def last_12_months(cls) -> "DateRange":
-        """Create a date range for the last 12 months."""
-        end_date = datetime.now(UTC)
+        """Create a date range for the last 12 months, in whole minutes.
+
+        Reports requested moments apart then cover the same range and share cached results.
+        """
+        end_date = datetime.now(UTC).replace(second=0, microsecond=0)
         start_date = end_date - timedelta(days=365)
         return cls(start_date=start_date, end_date=end_date)
 
@@ -63,6 +66,19 @@ class DateRange:
             and self.start_date.year == self.end_date.year
         )
 
+    def has_ended(self, since: timedelta = timedelta()) -> bool:
+        """Check if the whole range lies in the past, by at least since. Naive datetimes are treated as UTC."""
+        end_date = self.end_date if self.end_date.tzinfo else self.end_date.replace(tzinfo=UTC)
+        return end_date + since < datetime.now(UTC)
+
+    def split(self, parts: int) -> list["DateRange"]:
+        """Split into consecutive, non-overlapping ranges of whole seconds."""
+        start = self.start_date.replace(microsecond=0)
+        step = (self.end_date - start) / parts
+        bounds = [(start + step * i).replace(microsecond=0) for i in range(parts)]
+        bounds.append(self.end_date + timedelta(seconds=1))
+        return [DateRange(start_date=bounds[i], end_date=bounds[i + 1] - timedelta(seconds=1)) for i in range(parts)]
+
     def is_last_12_months(self) -> bool:
         """Check if this approximately represents the last 12 months."""
         now = datetime.now(UTC)
@@ -71,7 +87,7 @@ class DateRange:
         return abs((self.end_date - now).days) <= 7 and abs((self.start_date - twelve_months_ago).days) <= 7
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ContributionStats:
     username: str
     date_range: DateRange
@@ -90,6 +106,7 @@ class ContributionStats:
     lines_added: int
     lines_deleted: int
     lines_calculation_method: str = ""
+    lines_complete: bool = True
     created_at: datetime = field(default_factory=datetime.now)
 
     # Backward compatibility property
@@ -99,7 +116,7 @@ class ContributionStats:
         return self.date_range.start_date.year
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Commit:
     oid: str
     committed_date: str
@@ -108,14 +125,14 @@ class Commit:
     author_login: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PullRequest:
     created_at: str
     additions: int
     deletions: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LineStats:
     """Container for line statistics with calculation method tracking."""
 
@@ -124,3 +141,5 @@ class LineStats:
     calculation_method: str
     pr_count: int = 0
     commit_count: int = 0
+    # False when some pages could not be read; such totals are shown but never persisted.
+    complete: bool = True
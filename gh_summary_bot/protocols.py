@@ -3,6 +3,7 @@ from typing import runtime_checkable
 
 from .models import ContributionStats
 from .models import DateRange
+from .models import LineStats
 
 
 @runtime_checkable
@@ -13,6 +14,10 @@ class GitHubSource(Protocol):
         """Fetch user contribution statistics for a date range."""
         ...
 
+    async def contributions_many(self, username: str, date_ranges: list[DateRange]) -> list[ContributionStats]:
+        """Fetch user contribution statistics for several date ranges."""
+        ...
+
     def with_progress_reporter(self, progress: "ProgressReporter") -> "GitHubSource":
         """Create new instance with progress reporter."""
         ...
@@ -27,6 +32,19 @@ class UserStorage(Protocol):
         ...
 
 
+@runtime_checkable
+class LineStatsCache(Protocol):
+    """Protocol for persisting line statistics of date ranges that have ended."""
+
+    async def line_stats(self, username: str, date_range: DateRange) -> LineStats | None:
+        """Fetch stored line statistics, if any."""
+        ...
+
+    async def store_line_stats(self, username: str, date_range: DateRange, stats: LineStats) -> None:
+        """Persist line statistics."""
+        ...
+
+
 @runtime_checkable
 class BotInterface(Protocol):
     """Protocol for bot command handling."""
@@ -2,8 +2,66 @@ import logging
 
 import aiopg
 
+from .models import DateRange
+from .models import LineStats
+
 logger = logging.getLogger(__name__)
 
+_STORE_USER_QUERY = """
+INSERT INTO telegram_users (telegram_id, github_username, last_query)
+VALUES (%s, %s, CURRENT_TIMESTAMP)
+ON CONFLICT (telegram_id) DO UPDATE SET
+    github_username = COALESCE(
+        EXCLUDED.github_username,
+        telegram_users.github_username
+    ),
+    last_query = CURRENT_TIMESTAMP
+"""
+
+_LINE_STATS_QUERY = """
+SELECT lines_added, lines_deleted, calculation_method, pr_count, commit_count
+FROM line_stats_cache
+WHERE github_username = %s AND start_date = %s AND end_date = %s
+"""
+
+_STORE_LINE_STATS_QUERY = """
+INSERT INTO line_stats_cache (
+    github_username, start_date, end_date,
+    lines_added, lines_deleted, calculation_method, pr_count, commit_count
+)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON CONFLICT (github_username, start_date, end_date) DO UPDATE SET
+    lines_added = EXCLUDED.lines_added,
+    lines_deleted = EXCLUDED.lines_deleted,
+    calculation_method = EXCLUDED.calculation_method,
+    pr_count = EXCLUDED.pr_count,
+    commit_count = EXCLUDED.commit_count,
+    created_at = CURRENT_TIMESTAMP
+"""
+
+_CREATE_TABLES_QUERY = """
+CREATE TABLE IF NOT EXISTS telegram_users (
+    id SERIAL PRIMARY KEY,
+    telegram_id BIGINT UNIQUE NOT NULL,
+    github_username VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_query TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS line_stats_cache (
+    github_username VARCHAR(255) NOT NULL,
+    start_date TIMESTAMPTZ NOT NULL,
+    end_date TIMESTAMPTZ NOT NULL,
+    lines_added BIGINT NOT NULL,
+    lines_deleted BIGINT NOT NULL,
+    calculation_method VARCHAR(32) NOT NULL,
+    pr_count INTEGER NOT NULL DEFAULT 0,
+    commit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (github_username, start_date, end_date)
+);
+"""
+
 
 class PostgreSQLUserStorage:
     def __init__(self, pool: aiopg.Pool) -> None:
@@ -11,19 +69,48 @@ class PostgreSQLUserStorage:
 
     async def store_user(self, telegram_id: int, github_username: str | None = None) -> None:
         """Store telegram user association."""
-        query = """
-        INSERT INTO telegram_users (telegram_id, github_username, last_query)
-        VALUES (%s, %s, CURRENT_TIMESTAMP)
-        ON CONFLICT (telegram_id) DO UPDATE SET
-            github_username = COALESCE(
-                EXCLUDED.github_username,
-                telegram_users.github_username
-            ),
-            last_query = CURRENT_TIMESTAMP
-        """
+        async with self._pool.acquire() as conn, conn.cursor() as cur:
+            await cur.execute(_STORE_USER_QUERY, (telegram_id, github_username))
+
 
+class PostgreSQLLineStatsCache:
+    def __init__(self, pool: aiopg.Pool) -> None:
+        self._pool = pool
+
+    async def line_stats(self, username: str, date_range: DateRange) -> LineStats | None:
+        """Fetch stored line statistics, if any."""
+        start_date, end_date = date_range.to_github_format()
         async with self._pool.acquire() as conn, conn.cursor() as cur:
-            await cur.execute(query, (telegram_id, github_username))
+            await cur.execute(_LINE_STATS_QUERY, (username, start_date, end_date))
+            row = await cur.fetchone()
+
+        if row is None:
+            return None
+        return LineStats(
+            lines_added=row[0],
+            lines_deleted=row[1],
+            calculation_method=row[2],
+            pr_count=row[3],
+            commit_count=row[4],
+        )
+
+    async def store_line_stats(self, username: str, date_range: DateRange, stats: LineStats) -> None:
+        """Persist line statistics."""
+        start_date, end_date = date_range.to_github_format()
+        async with self._pool.acquire() as conn, conn.cursor() as cur:
+            await cur.execute(
+                _STORE_LINE_STATS_QUERY,
+                (
+                    username,
+                    start_date,
+                    end_date,
+                    stats.lines_added,
+                    stats.lines_deleted,
+                    stats.calculation_method,
+                    stats.pr_count,
+                    stats.commit_count,
+                ),
+            )
 
 
 class DatabaseInitializer:
@@ -32,15 +119,5 @@ class DatabaseInitializer:
 
     async def initialize_tables(self) -> None:
         """Create necessary database tables."""
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS telegram_users (
-            id SERIAL PRIMARY KEY,
-            telegram_id BIGINT UNIQUE NOT NULL,
-            github_username VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_query TIMESTAMP
-        );
-        """
-
         async with self._pool.acquire() as conn, conn.cursor() as cur:
-            await cur.execute(create_table_query)
+            await cur.execute(_CREATE_TABLES_QUERY)
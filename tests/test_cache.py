@@ -0,0 +1,80 @@
+"""Tests for in-process caching primitives."""
+
+import asyncio
+
+import pytest
+
+from gh_summary_bot.cache import SingleFlight
+from gh_summary_bot.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test suite for TTLCache."""
+
+    @pytest.fixture
+    def cache(self):
+        """Create a small cache to exercise eviction."""
+        return TTLCache(max_size=2)
+
+    def test_returns_stored_value(self, cache):
+        """Test that a stored value is returned before it expires."""
+        cache.put("a", 1, ttl=60)
+
+        assert cache.get("a") == 1
+
+    def test_missing_key_returns_none(self, cache):
+        """Test that unknown keys miss."""
+        assert cache.get("missing") is None
+
+    def test_expired_entry_is_dropped(self, cache):
+        """Test that expired entries miss and are removed."""
+        cache.put("a", 1, ttl=0)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self, cache):
+        """Test that overflow evicts the least recently used entry."""
+        cache.put("a", 1, ttl=60)
+        cache.put("b", 2, ttl=60)
+        cache.get("a")
+        cache.put("c", 3, ttl=60)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Test that concurrent callers with the same key share a single computation."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return "result"
+
+        results = await asyncio.gather(*(flight.run("key", compute) for _ in range(3)))
+
+        assert results == ["result"] * 3
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_key_is_released_after_completion(self):
+        """Test that a finished computation is not reused by later callers."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flight.run("key", compute) == 1
+        assert await flight.run("key", compute) == 2
@@ -1,14 +1,30 @@
 """Tests for GitHub source line calculation accuracy."""
 
+import asyncio
+import itertools
+import json
+import time
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
 from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
 
 import pytest
+from multidict import CIMultiDict
+from multidict import CIMultiDictProxy
 
+from gh_summary_bot.github_source import GitHubAPIError
 from gh_summary_bot.github_source import GitHubContributionSource
 from gh_summary_bot.github_source import GraphQLClient
+from gh_summary_bot.github_source import GraphQLError
+from gh_summary_bot.github_source import RequestConfig
+from gh_summary_bot.github_source import TokenBucket
 from gh_summary_bot.models import ContributionStats
 from gh_summary_bot.models import DateRange
+from gh_summary_bot.models import LineStats
 from gh_summary_bot.models import PullRequest
+from gh_summary_bot.protocols import LineStatsCache
 
 
 class TestGitHubSourceLineCalculation:
@@ -69,6 +85,7 @@ class TestGitHubSourceLineCalculation:
         """Mock GitHub contributions collection data."""
         return {
             "user": {
+                "id": "U_1",
                 "contributionsCollection": {
                     "totalCommitContributions": 150,
                     "totalIssueContributions": 25,
@@ -82,6 +99,7 @@ class TestGitHubSourceLineCalculation:
                         {
                             "repository": {
                                 "name": "test-repo",
+                                "owner": {"login": "testuser"},
                                 "primaryLanguage": {"name": "Python"},
                             },
                             "contributions": {"totalCount": 100},
@@ -97,6 +115,30 @@ class TestGitHubSourceLineCalculation:
             }
         }
 
+    @pytest.fixture
+    def empty_pr_search(self, mock_contributions_data):
+        """Make the embedded merged PR search come back empty, so line stats fall back to commits."""
+        mock_contributions_data["search"] = {
+            "issueCount": 0,
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [],
+        }
+        return mock_contributions_data
+
+    @pytest.fixture
+    def contributions_query(self, mock_contributions_data):
+        """Build a query side effect answering the contributions document and delegating other queries."""
+
+        def build(other_queries):
+            async def query(query, variables):
+                if "totalCommitContributions" in query:
+                    return mock_contributions_data
+                return await other_queries(query, variables)
+
+            return query
+
+        return build
+
     @pytest.mark.asyncio
     async def test_basic_contributions_fetch(self, github_source, mock_contributions_data, mock_client):
         """Test basic contribution fetching."""
@@ -113,6 +155,329 @@ class TestGitHubSourceLineCalculation:
         assert result.total_issues == 25
         assert result.languages == {"Python": 100}
 
+    @pytest.mark.asyncio
+    async def test_contributions_use_embedded_pr_page(self, github_source, mock_contributions_data, mock_client):
+        """Test that line stats come from the PR page embedded in the contributions response."""
+        mock_contributions_data["search"] = {
+            "issueCount": 3,
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [
+                {
+                    "createdAt": "2024-03-01T10:00:00Z",
+                    "mergedAt": "2024-03-02T10:00:00Z",
+                    "additions": 30,
+                    "deletions": 5,
+                },
+                {
+                    "createdAt": "2023-12-30T10:00:00Z",
+                    "mergedAt": "2024-01-02T10:00:00Z",
+                    "additions": 10,
+                    "deletions": 2,
+                },
+                {
+                    "createdAt": "2023-06-01T10:00:00Z",
+                    "mergedAt": "2023-06-02T10:00:00Z",
+                    "additions": 99,
+                    "deletions": 9,
+                },
+            ],
+        }
+        mock_client.query.return_value = mock_contributions_data
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert mock_client.query.await_count == 1
+        assert result.lines_added == 40
+        assert result.lines_deleted == 7
+        assert result.lines_calculation_method == "pull_requests"
+
+    @pytest.mark.asyncio
+    async def test_failed_embedded_search_is_fetched_separately(
+        self, github_source, mock_contributions_data, mock_client
+    ):
+        """Test that an error confined to the embedded PR search doesn't fail the whole report."""
+        search_page = {
+            "issueCount": 1,
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [
+                {
+                    "createdAt": "2024-03-01T10:00:00Z",
+                    "mergedAt": "2024-03-02T10:00:00Z",
+                    "additions": 30,
+                    "deletions": 5,
+                },
+            ],
+        }
+
+        async def query(query, _variables):
+            if "totalCommitContributions" in query:
+                raise GraphQLError(
+                    "GraphQL errors: Search timed out",
+                    [{"message": "Search timed out", "path": ["search"]}],
+                    {**mock_contributions_data, "search": None},
+                )
+            return {"search": search_page}
+
+        mock_client.query.side_effect = query
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert result.total_commits == 150
+        assert result.lines_added == 30
+        assert result.lines_calculation_method == "pull_requests"
+
+    @pytest.mark.asyncio
+    async def test_search_overflow_walks_all_merged_prs(
+        self, github_source, mock_contributions_data, mock_client, contributions_query
+    ):
+        """Test that more matches than search returns switch to walking the user's merged PRs."""
+        mock_contributions_data["search"] = {
+            "issueCount": 1500,
+            "pageInfo": {"hasNextPage": True, "endCursor": "s1"},
+            "nodes": [],
+        }
+        merged_prs = {
+            "user": {
+                "pullRequests": {
+                    "pageInfo": {"hasNextPage": True, "endCursor": "p1"},
+                    "nodes": [
+                        {
+                            "createdAt": "2025-01-10T10:00:00Z",
+                            "mergedAt": "2025-01-11T10:00:00Z",
+                            "updatedAt": "2025-01-11T10:00:00Z",
+                            "additions": 99,
+                            "deletions": 9,
+                        },
+                        {
+                            "createdAt": "2024-05-01T10:00:00Z",
+                            "mergedAt": "2024-05-02T10:00:00Z",
+                            "updatedAt": "2024-05-02T10:00:00Z",
+                            "additions": 30,
+                            "deletions": 5,
+                        },
+                        {
+                            "createdAt": "2023-05-01T10:00:00Z",
+                            "mergedAt": "2023-05-02T10:00:00Z",
+                            "updatedAt": "2023-05-02T10:00:00Z",
+                            "additions": 7,
+                            "deletions": 7,
+                        },
+                    ],
+                }
+            }
+        }
+
+        async def other_queries(_query, _variables):
+            return merged_prs
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert result.lines_added == 30
+        assert result.lines_deleted == 5
+        assert result.lines_calculation_method == "pull_requests"
+        # The walk stops at the first page updated before the range.
+        assert mock_client.query.await_count == 2
+        assert mock_client.query.await_args.args[1] == {"login": "testuser", "cursor": None}
+
+    @pytest.mark.asyncio
+    async def test_merged_pr_search_is_bounded_by_range(self, github_source, mock_contributions_data, mock_client):
+        """Test that the merged PR search is restricted to the requested range on GitHub's side."""
+        mock_client.query.return_value = mock_contributions_data
+
+        await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        variables = mock_client.query.await_args_list[0].args[1]
+        assert variables["prSearch"] == "is:pr is:merged author:testuser created:<=2025-01-01 merged:>=2023-12-31"
+
+    @pytest.mark.asyncio
+    async def test_contributions_are_cached_per_range(self, github_source, mock_contributions_data, mock_client):
+        """Test that repeated reports for the same range are served from the cache."""
+        mock_contributions_data["search"] = {
+            "issueCount": 1,
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [
+                {
+                    "createdAt": "2023-03-01T10:00:00Z",
+                    "mergedAt": "2023-03-02T10:00:00Z",
+                    "additions": 3,
+                    "deletions": 1,
+                },
+            ],
+        }
+        mock_client.query.return_value = mock_contributions_data
+
+        first = await github_source.contributions("testuser", DateRange.calendar_year(2023))
+        second = await github_source.with_progress_reporter(AsyncMock()).contributions(
+            "testuser", DateRange.calendar_year(2023)
+        )
+
+        assert second is first
+        assert mock_client.query.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_last_12_months_reports_share_the_cache(
+        self, github_source, mock_contributions_data, mock_client, monkeypatch
+    ):
+        """Test that back-to-back default reports reuse one fetch despite a moving clock."""
+        ticks = itertools.count()
+
+        class TickingDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime(2024, 6, 1, 12, 30, 15, next(ticks), tzinfo=tz)
+
+        monkeypatch.setattr("gh_summary_bot.models.datetime", TickingDatetime)
+        mock_contributions_data["search"] = {
+            "issueCount": 1,
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [
+                {
+                    "createdAt": "2024-03-01T10:00:00Z",
+                    "mergedAt": "2024-03-02T10:00:00Z",
+                    "additions": 3,
+                    "deletions": 1,
+                },
+            ],
+        }
+        mock_client.query.return_value = mock_contributions_data
+
+        first = await github_source.contributions("testuser", DateRange.last_12_months())
+        second = await github_source.contributions("TestUser", DateRange.last_12_months())
+
+        assert second is first
+        assert mock_client.query.await_count == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search", "contributed_repositories")
+    async def test_partial_line_stats_are_not_cached(self, github_source, mock_client, contributions_query):
+        """Test that a report whose commit history was partly unreadable is fetched again."""
+
+        async def other_queries(_query, _variables):
+            raise GraphQLError("GraphQL errors: Could not resolve to a Repository")
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+
+        first = await github_source.contributions("testuser", DateRange.calendar_year(2023))
+        second = await github_source.contributions("testuser", DateRange.calendar_year(2023))
+
+        assert not first.lines_complete
+        assert second is not first
+
+    @pytest.mark.asyncio
+    async def test_contributions_many_keeps_range_order(self, github_source, mock_contributions_data, mock_client):
+        """Test that several ranges are fetched together and returned in request order."""
+        mock_client.query.return_value = mock_contributions_data
+        ranges = [DateRange.calendar_year(2022), DateRange.calendar_year(2023)]
+
+        results = await github_source.contributions_many("testuser", ranges)
+
+        assert [stats.date_range for stats in results] == ranges
+
+    @pytest.mark.asyncio
+    async def test_line_stats_reused_for_past_ranges(self, mock_client, mock_contributions_data):
+        """Test that persisted line stats for an ended range skip the line calculation."""
+        line_stats_cache = AsyncMock(spec=LineStatsCache)
+        line_stats_cache.line_stats.return_value = LineStats(
+            lines_added=500, lines_deleted=50, calculation_method="commits", commit_count=12
+        )
+        mock_client.query.return_value = mock_contributions_data
+        source = GitHubContributionSource(mock_client, line_stats_cache=line_stats_cache)
+
+        result = await source.contributions("testuser", DateRange.calendar_year(2023))
+
+        assert result.lines_added == 500
+        assert result.lines_calculation_method == "commits"
+        assert mock_client.query.await_count == 1
+        line_stats_cache.store_line_stats.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_line_stats_persisted_for_past_ranges(self, mock_client, mock_contributions_data):
+        """Test that freshly calculated line stats for an ended range are persisted under the lower-cased login."""
+        line_stats_cache = AsyncMock(spec=LineStatsCache)
+        line_stats_cache.line_stats.return_value = None
+        mock_contributions_data["search"] = {
+            "issueCount": 1,
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+            "nodes": [
+                {
+                    "createdAt": "2023-03-01T10:00:00Z",
+                    "mergedAt": "2023-03-02T10:00:00Z",
+                    "additions": 3,
+                    "deletions": 1,
+                },
+            ],
+        }
+        mock_client.query.return_value = mock_contributions_data
+        source = GitHubContributionSource(mock_client, line_stats_cache=line_stats_cache)
+        date_range = DateRange.calendar_year(2023)
+
+        await source.contributions("TestUser", date_range)
+
+        line_stats_cache.store_line_stats.assert_awaited_once_with(
+            "testuser",
+            date_range,
+            LineStats(lines_added=3, lines_deleted=1, calculation_method="pull_requests", pr_count=1),
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search")
+    async def test_line_stats_of_recent_ranges_are_not_persisted(self, mock_client, mock_contributions_data):
+        """Test that totals of a range that only just ended stay open for PRs merged after it."""
+        line_stats_cache = AsyncMock(spec=LineStatsCache)
+        mock_client.query.return_value = mock_contributions_data
+        source = GitHubContributionSource(mock_client, line_stats_cache=line_stats_cache)
+        end_date = datetime.now(UTC) - timedelta(days=2)
+
+        await source.contributions("testuser", DateRange(start_date=end_date - timedelta(days=30), end_date=end_date))
+
+        line_stats_cache.line_stats.assert_not_awaited()
+        line_stats_cache.store_line_stats.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search", "contributed_repositories")
+    async def test_failed_history_is_not_persisted(self, mock_client, contributions_query):
+        """Test that commit totals missing a history query are reported but not persisted."""
+        line_stats_cache = AsyncMock(spec=LineStatsCache)
+        line_stats_cache.line_stats.return_value = None
+
+        async def other_queries(_query, _variables):
+            raise GitHubAPIError("Forbidden. You may have exceeded rate limits.")
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+        source = GitHubContributionSource(mock_client, line_stats_cache=line_stats_cache)
+
+        await source.contributions("testuser", DateRange.calendar_year(2023))
+
+        line_stats_cache.store_line_stats.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_failed_pr_search_skips_commit_fallback(
+        self, mock_client, mock_contributions_data, contributions_query
+    ):
+        """Test that an erroring PR search is not mistaken for a range without PRs."""
+        line_stats_cache = AsyncMock(spec=LineStatsCache)
+        line_stats_cache.line_stats.return_value = None
+        mock_contributions_data["search"] = {
+            "issueCount": 150,
+            "pageInfo": {"hasNextPage": True, "endCursor": "c1"},
+            "nodes": [],
+        }
+
+        async def other_queries(_query, _variables):
+            raise GitHubAPIError("Forbidden. You may have exceeded rate limits.")
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+        source = GitHubContributionSource(mock_client, line_stats_cache=line_stats_cache)
+
+        result = await source.contributions("testuser", DateRange.calendar_year(2023))
+
+        assert result.lines_calculation_method == "error"
+        # The contributions query and the failed second search page; no history queries.
+        assert mock_client.query.await_count == 2
+        line_stats_cache.store_line_stats.assert_not_awaited()
+
     @pytest.mark.asyncio
     async def test_pull_requests_fetch(self, github_source, mock_pr_data, mock_client):
         """Test pull requests fetching."""
@@ -134,6 +499,422 @@ class TestGitHubSourceLineCalculation:
         assert result[0].additions == 75
         assert result[1].deletions == 8
 
+    @pytest.fixture
+    def repo_contributions(self):
+        """Commit contributions for two repositories with commits and one without."""
+        return [
+            {
+                "repository": {"name": "repo-a", "owner": {"login": "testuser"}, "primaryLanguage": None},
+                "contributions": {"totalCount": 2},
+            },
+            {
+                "repository": {"name": "repo-b", "owner": {"login": "testuser"}, "primaryLanguage": None},
+                "contributions": {"totalCount": 1},
+            },
+            {
+                "repository": {"name": "repo-empty", "owner": {"login": "testuser"}, "primaryLanguage": None},
+                "contributions": {"totalCount": 0},
+            },
+        ]
+
+    @pytest.fixture
+    def contributed_repositories(self, mock_contributions_data, repo_contributions):
+        """Attribute the report's commits to the repo_contributions repositories."""
+        mock_contributions_data["user"]["contributionsCollection"]["commitContributionsByRepository"] = (
+            repo_contributions
+        )
+        return mock_contributions_data
+
+    @pytest.fixture
+    def commit_history_query(self, mock_commit_data, repo_contributions):
+        """Build a query side effect serving a two-repository commit history."""
+        repos_response = {
+            "user": {
+                "id": "U_1",
+                "contributionsCollection": {"commitContributionsByRepository": repo_contributions},
+            }
+        }
+        history_by_repo = {"repo-a": mock_commit_data[:2], "repo-b": mock_commit_data[2:]}
+
+        def history(repo):
+            return {
+                "object": {
+                    "history": {
+                        "pageInfo": {"hasNextPage": False, "endCursor": None},
+                        "nodes": history_by_repo[repo],
+                    }
+                }
+            }
+
+        async def query(_query, variables):
+            if "repo" in variables:
+                return {"repository": history(variables["repo"])}
+            if "repo0" in variables:
+                return {
+                    f"r{i}": history(variables[f"repo{i}"])
+                    for i in range(len(history_by_repo))
+                    if f"repo{i}" in variables
+                }
+            return repos_response
+
+        return query
+
+    @pytest.mark.asyncio
+    async def test_commits_fetch_across_repositories(self, github_source, commit_history_query, mock_client):
+        """Test that commits from every contributed repository are combined in order."""
+        mock_client.query.side_effect = commit_history_query
+
+        result = await github_source.commits("testuser", DateRange.calendar_year(2024))
+
+        assert [commit.oid for commit in result] == ["abc123", "def456", "ghi789"]
+        assert sum(commit.additions for commit in result) == 175
+        queried_repos = [call.args[1].get("repo") for call in mock_client.query.await_args_list]
+        assert "repo-empty" not in queried_repos
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search", "contributed_repositories")
+    async def test_line_stats_fall_back_to_commits(
+        self, github_source, commit_history_query, mock_client, contributions_query
+    ):
+        """Test that commit history is summed when no merged PRs fall in the range."""
+        mock_client.query.side_effect = contributions_query(commit_history_query)
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert result.lines_calculation_method == "commits"
+        assert result.lines_added == 175
+        assert result.lines_deleted == 45
+        # The contributions query, then one aliased history query for both repositories.
+        assert mock_client.query.await_count == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search")
+    async def test_busy_repository_history_is_split_into_windows(
+        self, github_source, mock_contributions_data, mock_client, contributions_query
+    ):
+        """Test that a repository with several pages of commits is read as parallel time windows."""
+        mock_contributions_data["user"]["contributionsCollection"]["commitContributionsByRepository"] = [
+            {
+                "repository": {"name": "busy", "owner": {"login": "testuser"}, "primaryLanguage": None},
+                "contributions": {"totalCount": 250},
+            }
+        ]
+        window_page = {
+            "object": {
+                "history": {
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                    "nodes": [{"additions": 1, "deletions": 1}],
+                }
+            }
+        }
+
+        async def other_queries(_query, variables):
+            return {f"r{i}": window_page for i in range(10) if f"repo{i}" in variables}
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert mock_client.query.await_count == 2
+        variables = mock_client.query.await_args.args[1]
+        windows = [(variables[f"since{i}"], variables[f"until{i}"]) for i in range(3)]
+        assert windows[0][0] == "2024-01-01T00:00:00Z"
+        assert windows[-1][1] == "2024-12-31T23:59:59Z"
+        assert all(previous[1] < current[0] for previous, current in itertools.pairwise(windows))
+        assert result.lines_added == 3
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search", "contributed_repositories")
+    async def test_failed_history_batch_retries_repositories_individually(
+        self, github_source, commit_history_query, mock_client, contributions_query
+    ):
+        """Test that a failing aliased history query falls back to one query per repository."""
+
+        async def other_queries(query, variables):
+            if "repo0" in variables:
+                raise GraphQLError("GraphQL errors: Could not resolve to a Repository")
+            return await commit_history_query(query, variables)
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert result.lines_calculation_method == "commits"
+        assert result.lines_added == 175
+        assert result.lines_deleted == 45
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search", "contributed_repositories")
+    async def test_throttled_history_batch_is_not_retried_per_window(
+        self, github_source, mock_client, contributions_query
+    ):
+        """Test that a rate-limited history batch fails the commit totals instead of fanning out."""
+
+        async def other_queries(_query, _variables):
+            raise GitHubAPIError("Forbidden. You may have exceeded rate limits.")
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert result.lines_calculation_method == "error"
+        assert mock_client.query.await_count == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search")
+    async def test_failed_history_batch_cancels_the_others(
+        self, github_source, mock_contributions_data, mock_client, contributions_query
+    ):
+        """Test that one failing history batch stops the batches still paging."""
+        mock_contributions_data["user"]["contributionsCollection"]["commitContributionsByRepository"] = [
+            {
+                "repository": {"name": "busy", "owner": {"login": "testuser"}, "primaryLanguage": None},
+                "contributions": {"totalCount": 1200},
+            }
+        ]
+        cancelled = asyncio.Event()
+
+        async def other_queries(_query, variables):
+            if "repo9" in variables:
+                raise GitHubAPIError("Forbidden. You may have exceeded rate limits.")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+
+        result = await github_source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert result.lines_calculation_method == "error"
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("empty_pr_search")
+    async def test_history_retries_stay_within_concurrency_limit(
+        self, mock_client, mock_contributions_data, contributions_query
+    ):
+        """Test that per-window retries of failed batches share the source's concurrency bound."""
+        mock_contributions_data["user"]["contributionsCollection"]["commitContributionsByRepository"] = [
+            {
+                "repository": {"name": f"repo-{i}", "owner": {"login": "testuser"}, "primaryLanguage": None},
+                "contributions": {"totalCount": 1},
+            }
+            for i in range(80)
+        ]
+        in_flight = 0
+        peak = 0
+
+        async def other_queries(_query, variables):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            if "repo0" in variables:
+                raise GraphQLError("GraphQL errors: Could not resolve to a Repository")
+            return {"repository": {"object": None}}
+
+        mock_client.query.side_effect = contributions_query(other_queries)
+        source = GitHubContributionSource(mock_client, max_concurrency=8)
+
+        await source.contributions("testuser", DateRange.calendar_year(2024))
+
+        assert peak <= 8
+
+
+class FakeResponse:
+    """Minimal stand-in for an aiohttp response context manager."""
+
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self._body = body or {}
+
+    async def read(self):
+        return json.dumps(self._body).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+class TestGraphQLClient:
+    """Test suite for GraphQLClient transport behaviour."""
+
+    @pytest.fixture
+    def session(self, monkeypatch):
+        """Patch aiohttp.ClientSession with a mock session."""
+        session = MagicMock()
+        session.close = AsyncMock()
+        monkeypatch.setattr("gh_summary_bot.github_source.aiohttp.ClientSession", lambda **_kwargs: session)
+        return session
+
+    @pytest.fixture
+    def config(self):
+        """Create a request config with instant retries."""
+        return RequestConfig(base_url="https://example.test/graphql", token="test-token", retry_base_delay=0.0)  # noqa: S106
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self, session, config):
+        """Test that gateway errors are retried until a response succeeds."""
+        session.post.side_effect = [
+            FakeResponse(502),
+            FakeResponse(429, headers={"Retry-After": "0"}),
+            FakeResponse(200, {"data": {"viewer": {"login": "testuser"}}}),
+        ]
+
+        async with GraphQLClient(config) as client:
+            result = await client.query("query { viewer { login } }")
+
+        assert result == {"viewer": {"login": "testuser"}}
+        assert session.post.call_count == 3
+        bodies = [call.kwargs["data"] for call in session.post.call_args_list]
+        assert json.loads(bodies[0]) == {"query": "query { viewer { login } }", "variables": {}}
+        assert all(body is bodies[0] for body in bodies)
+
+    @pytest.mark.asyncio
+    async def test_sends_caller_documents_unchanged(self, session, config):
+        """Test that documents passed in by callers keep their comments and line breaks."""
+        document = 'query {\n  # login only\n  viewer { login }\n  search(query: "a  b", type: ISSUE) { issueCount }\n}'
+        session.post.side_effect = [FakeResponse(200, {"data": {}})]
+
+        async with GraphQLClient(config) as client:
+            await client.query(document)
+
+        assert json.loads(session.post.call_args.kwargs["data"])["query"] == document
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, session, config):
+        """Test that persistent gateway errors surface as GitHubAPIError."""
+        session.post.side_effect = [FakeResponse(503) for _ in range(config.max_retries + 1)]
+
+        async with GraphQLClient(config) as client:
+            with pytest.raises(GitHubAPIError, match="HTTP 503"):
+                await client.query("query { viewer { login } }")
+
+        assert session.post.call_count == config.max_retries + 1
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_client_errors(self, session, config):
+        """Test that non-transient HTTP errors fail immediately."""
+        session.post.side_effect = [FakeResponse(401)]
+
+        async with GraphQLClient(config) as client:
+            with pytest.raises(GitHubAPIError, match="Authentication failed"):
+                await client.query("query { viewer { login } }")
+
+        assert session.post.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_graphql_errors_keep_partial_data(self, session, config):
+        """Test that GraphQL errors carry the fields GitHub could still resolve."""
+        body = {
+            "data": {"viewer": {"login": "testuser"}, "search": None},
+            "errors": [{"message": "Search timed out", "path": ["search"]}],
+        }
+        session.post.side_effect = [FakeResponse(200, body)]
+
+        async with GraphQLClient(config) as client:
+            with pytest.raises(GraphQLError, match="Search timed out") as excinfo:
+                await client.query("query { viewer { login } }")
+
+        assert excinfo.value.data == body["data"]
+        assert excinfo.value.only_affects("search")
+        assert not excinfo.value.only_affects("viewer")
+
+    @pytest.mark.asyncio
+    async def test_error_body_is_truncated(self, session, config):
+        """Test that the body of a failed request is quoted in the error, capped at 500 bytes."""
+        session.post.side_effect = [FakeResponse(422, {"message": "x" * 1000})]
+
+        async with GraphQLClient(config) as client:
+            with pytest.raises(GitHubAPIError, match="HTTP 422") as excinfo:
+                await client.query("query { viewer { login } }")
+
+        assert len(str(excinfo.value)) == len("HTTP 422: ") + 500
+
+    @pytest.mark.asyncio
+    async def test_waits_for_reset_when_query_budget_runs_low(self, session, config, monkeypatch):
+        """Test that the rateLimit field of a response holds back the next query until the reset."""
+        sleep = AsyncMock()
+        monkeypatch.setattr("gh_summary_bot.github_source.asyncio.sleep", sleep)
+        reset_at = datetime.fromtimestamp(time.time() + 60, tz=UTC).isoformat()
+        rate_limit = {"cost": 30, "remaining": 120, "limit": 5000, "resetAt": reset_at}
+        session.post.side_effect = [
+            FakeResponse(200, {"data": {"viewer": {"login": "testuser"}, "rateLimit": rate_limit}}),
+            FakeResponse(200, {"data": {"viewer": {"login": "testuser"}}}),
+        ]
+
+        async with GraphQLClient(config) as client:
+            await client.query("query { viewer { login } }")
+            sleep.assert_not_awaited()
+            await client.query("query { viewer { login } }")
+
+        # 120 points left minus the 30 the last query cost falls under the 100-point threshold.
+        sleep.assert_awaited_once()
+        assert sleep.await_args.args[0] == pytest.approx(60 + config.safety_buffer, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_reads_rate_limit_headers_case_insensitively(self, session, config, monkeypatch):
+        """Test that GitHub's mixed-case rate limit headers, including the resource name, are parsed."""
+        sleep = AsyncMock()
+        monkeypatch.setattr("gh_summary_bot.github_source.asyncio.sleep", sleep)
+        headers = CIMultiDictProxy(
+            CIMultiDict(
+                {
+                    "X-RateLimit-Limit": "5000",
+                    "X-RateLimit-Remaining": "10",
+                    "X-RateLimit-Reset": str(int(time.time()) + 60),
+                    "X-RateLimit-Used": "4990",
+                    "X-RateLimit-Resource": "graphql",
+                }
+            )
+        )
+        session.post.side_effect = [
+            FakeResponse(200, {"data": {}}, headers=headers),
+            FakeResponse(200, {"data": {}}),
+        ]
+
+        async with GraphQLClient(config) as client:
+            await client.query("query { viewer { login } }")
+            await client.query("query { viewer { login } }")
+
+        assert any(call.args[0] > 60 for call in sleep.await_args_list)
+
+
+class TestTokenBucket:
+    """Test suite for the proactive request budget."""
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_when_empty(self, monkeypatch):
+        """Test that an exhausted bucket sleeps for the refill time of the missing tokens."""
+        sleep = AsyncMock()
+        monkeypatch.setattr("gh_summary_bot.github_source.asyncio.sleep", sleep)
+        bucket = TokenBucket(capacity=2, refill_per_second=0.5)
+
+        await bucket.acquire()
+        await bucket.acquire()
+        sleep.assert_not_awaited()
+
+        await bucket.acquire()
+        sleep.assert_awaited_once()
+        assert sleep.await_args.args[0] == pytest.approx(2.0, abs=0.01)
+
+    def test_throttling_halves_rate_and_success_recovers_it(self):
+        """Test the multiplicative decrease and additive increase of the refill rate."""
+        bucket = TokenBucket(capacity=10, refill_per_second=1.0)
+
+        bucket.throttled()
+        assert bucket.rate == 0.5
+
+        for _ in range(10):
+            bucket.succeeded()
+        assert bucket.rate == 1.0
+
 
 if __name__ == "__main__":
     pytest.main([__file__])